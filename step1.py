@@ -1,19 +1,174 @@
 import sqlite3
 import pandas as pd
 import argparse
+import sys
 
-#loads a csv file into a SQLite db using pandas.
-def load_csv_to_sqlite(csv_file: str, db_name: str, table_name: str):
-    # Read CSV into a DataFrame
-    df = pd.read_csv(csv_file)
-    print(f"CSV '{csv_file}' loaded successfully. Columns: {list(df.columns)}")
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:
+    # pyarrow is optional; without it CSVs are parsed with pandas
+    pa = None
+
+try:
+    import polars as pl
+except ImportError:
+    # polars is optional as well
+    pl = None
+
+# CSV parsers available in this environment, fastest first
+CSV_ENGINES = [name for name, module in (("polars", pl), ("arrow", pa), ("pandas", pd)) if module is not None]
+
+# Number of CSV rows held in memory (and inserted) at a time
+CHUNK_SIZE = 100_000
+
+# Number of leading CSV rows pandas reads to infer column types
+SAMPLE_ROWS = 10_000
+
+# Cell values read as missing (NULL); pandas' default na_values, passed to the
+# polars and pyarrow readers so every engine stores the same values
+NULL_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+# Bytes of CSV parsed per pyarrow batch
+ARROW_BLOCK_SIZE = 8 << 20
+
+# PRAGMAs applied to every connection before loading or querying data
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-200000",
+    "mmap_size=268435456",
+)
+
+#applies PRAGMAs that speed up bulk inserts (WAL, fewer fsyncs, bigger cache, mmap reads)
+def tune_connection(conn):
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma};")
+
+#maps a pandas dtype to an appropriate SQLite type via its numpy kind code
+#('i'/'u' integer, 'f' float), avoiding a walk of pandas' dtype registry.
+def infer_sqlite_type(dtype):
+    kind = getattr(dtype, "kind", "O")
+    if kind in "iu":
+        return "INTEGER"
+    elif kind == "f":
+        return "REAL"
+    else:
+        # Default to TEXT for strings, objects, etc.
+        return "TEXT"
+
+#maps a pyarrow type to an appropriate SQLite type.
+def arrow_to_sqlite_type(arrow_type):
+    if pa.types.is_integer(arrow_type):
+        return "INTEGER"
+    elif pa.types.is_floating(arrow_type):
+        return "REAL"
+    else:
+        # Strings, timestamps, dates, etc. are stored as TEXT
+        return "TEXT"
+
+#converts a pyarrow RecordBatch into an iterator of row tuples for executemany.
+def arrow_batch_to_rows(batch):
+    columns = [column.to_pylist() for column in batch.columns]
+    # executemany pulls one tuple at a time, so the rows are never materialized as a list
+    return zip(*columns)
+
+#maps a polars dtype to an appropriate SQLite type.
+def polars_to_sqlite_type(polars_dtype):
+    if polars_dtype.is_integer():
+        return "INTEGER"
+    elif polars_dtype.is_float():
+        return "REAL"
+    else:
+        # Strings, booleans, dates, etc. are stored as TEXT
+        return "TEXT"
+
+#opens a CSV for streaming and returns (columns, sqlite_types, batches).
+#types come from the first batch (or a row sample); batches yields row tuples ready for executemany.
+#engine picks the parser: "polars", "arrow" (pyarrow's streaming reader) or "pandas" (chunked reader).
+def open_csv_batches(csv_file: str, engine: str = CSV_ENGINES[0]):
+    if engine == "polars":
+        # Infer types from the first SAMPLE_ROWS rows only, then stream the file with
+        # every column read as strings so later rows can't fail type inference;
+        # SQLite's column affinity converts the values on insert
+        schema = pl.scan_csv(csv_file, infer_schema_length=SAMPLE_ROWS, null_values=NULL_VALUES).collect_schema()
+        columns = schema.names()
+        sqlite_types = [polars_to_sqlite_type(dtype) for dtype in schema.dtypes()]
+        frames = pl.scan_csv(csv_file, infer_schema=False, null_values=NULL_VALUES).collect_batches(chunk_size=CHUNK_SIZE)
+        batches = (frame.iter_rows() for frame in frames)
+        return columns, sqlite_types, batches
+
+    if engine == "arrow":
+        read_options = pacsv.ReadOptions(block_size=ARROW_BLOCK_SIZE, use_threads=True)
+        # Infer types from the first block only, then read every column as nullable
+        # strings so a later value that doesn't fit the inferred type can't abort the
+        # load; SQLite's column affinity converts the values on insert
+        sample_reader = pacsv.open_csv(
+            csv_file, read_options=read_options, convert_options=pacsv.ConvertOptions(null_values=NULL_VALUES)
+        )
+        columns = sample_reader.schema.names
+        sqlite_types = [arrow_to_sqlite_type(field.type) for field in sample_reader.schema]
+        sample_reader.close()
+        convert_options = pacsv.ConvertOptions(
+            column_types={col: pa.string() for col in columns},
+            null_values=NULL_VALUES,
+            strings_can_be_null=True,
+        )
+        reader = pacsv.open_csv(csv_file, read_options=read_options, convert_options=convert_options)
+        batches = (arrow_batch_to_rows(batch) for batch in reader)
+        return columns, sqlite_types, batches
+
+    # Infer types from a sample of rows instead of the whole file, then pin the
+    # TEXT columns so the bulk pass doesn't re-run numeric inference on them
+    sample = pd.read_csv(csv_file, nrows=SAMPLE_ROWS)
+    columns = list(sample.columns)
+    sqlite_types = [infer_sqlite_type(sample[col].dtype) for col in columns]
+    text_dtypes = {col: str for col, col_type in zip(columns, sqlite_types) if col_type == "TEXT"}
+    chunks = pd.read_csv(csv_file, chunksize=CHUNK_SIZE, dtype=text_dtypes)
+    batches = (chunk.itertuples(index=False, name=None) for chunk in chunks)
+    return columns, sqlite_types, batches
+
+#loads a csv file into a SQLite db in batches.
+def load_csv_to_sqlite(csv_file: str, db_name: str, table_name: str, engine: str = CSV_ENGINES[0]):
+    # Open the CSV as a stream of batches; the first batch drives the column types
+    try:
+        columns, sqlite_types, batches = open_csv_batches(csv_file, engine)
+    except Exception as e:
+        print(f"Error reading CSV file '{csv_file}': {str(e)}")
+        sys.exit(1)
+    print(f"CSV '{csv_file}' loaded successfully. Columns: {columns}")
 
     # Connect to (or create) the SQLite database
     conn = sqlite3.connect(db_name)
+    tune_connection(conn)
+    cursor = conn.cursor()
+
+    columns_with_types = ", ".join(f'"{col}" {col_type}' for col, col_type in zip(columns, sqlite_types))
+    column_list = ", ".join(f'"{col}"' for col in columns)
+    placeholders = ", ".join("?" * len(columns))
+    insert_sql = f'INSERT INTO "{table_name}" ({column_list}) VALUES ({placeholders});'
 
-    # Write the DataFrame to a SQL table
-    # if_exists='replace' will drop the table if it already exists
-    df.to_sql(table_name, conn, if_exists='replace', index=False)
+    # Replace the table and insert every batch inside a single transaction,
+    # so a CSV that fails partway through leaves the old table untouched
+    conn.execute("BEGIN")
+    try:
+        cursor.execute(f'DROP TABLE IF EXISTS "{table_name}";')
+        cursor.execute(f'CREATE TABLE "{table_name}" ({columns_with_types});')
+        for rows in batches:
+            cursor.executemany(insert_sql, rows)
+        # Refresh the query planner's statistics for the newly loaded rows
+        cursor.execute(f'ANALYZE "{table_name}";')
+        conn.commit()
+    except Exception as e:
+        # Parse errors can surface partway through the stream; nothing has been changed
+        conn.rollback()
+        conn.close()
+        print(f"Error loading CSV file '{csv_file}' into '{table_name}': {str(e)}")
+        sys.exit(1)
     print(f"Table '{table_name}' created/replaced in the database '{db_name}'.")
     
     # Return the connection so we can run queries later
@@ -24,7 +179,7 @@ def run_example_query(conn, table_name: str):
     cursor = conn.cursor()
     
     # For demonstration, let's just SELECT the first 5 rows
-    query = f"SELECT * FROM {table_name} LIMIT 5;"
+    query = f'SELECT * FROM "{table_name}" LIMIT 5;'
     cursor.execute(query)
     
     rows = cursor.fetchall()
@@ -38,10 +193,11 @@ def main():
     parser.add_argument("--db_name", required=True, help="Name of the SQLite database file.")
     parser.add_argument("--table_name", default="my_table", help="Name of the table to be created in SQLite.")
     
+    parser.add_argument("--engine", choices=CSV_ENGINES, default=CSV_ENGINES[0], help="CSV parser to use (default: fastest installed).")
     args = parser.parse_args()
     
     # 1. Load CSV into SQLite
-    conn = load_csv_to_sqlite(args.csv_file, args.db_name, args.table_name)
+    conn = load_csv_to_sqlite(args.csv_file, args.db_name, args.table_name, args.engine)
     
     # 2. Run an example query
     run_example_query(conn, args.table_name)
@@ -1,47 +1,201 @@
 import sqlite3
 import pandas as pd
 import argparse
+import sys
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:
+    # pyarrow is optional; without it CSVs are parsed with pandas
+    pa = None
+
+try:
+    import polars as pl
+except ImportError:
+    # polars is optional as well
+    pl = None
+
+# CSV parsers available in this environment, fastest first
+CSV_ENGINES = [name for name, module in (("polars", pl), ("arrow", pa), ("pandas", pd)) if module is not None]
+
+# Number of CSV rows held in memory (and inserted) at a time
+CHUNK_SIZE = 100_000
+
+# Number of leading CSV rows pandas reads to infer column types
+SAMPLE_ROWS = 10_000
+
+# Cell values read as missing (NULL); pandas' default na_values, passed to the
+# polars and pyarrow readers so every engine stores the same values
+NULL_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+# Bytes of CSV parsed per pyarrow batch
+ARROW_BLOCK_SIZE = 8 << 20
+
+# PRAGMAs applied to every connection before loading or querying data
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-200000",
+    "mmap_size=268435456",
+)
+
+def tune_connection(conn):
+    """
+    Applies PRAGMAs that speed up bulk inserts and reads:
+    WAL journaling, fewer fsyncs, in-memory temp storage,
+    a larger page cache and memory-mapped I/O.
+    """
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma};")
 
 def infer_sqlite_type(dtype):
     """
     Map a pandas dtype to an appropriate SQLite type.
+    Reads the numpy kind code ('i'/'u' integer, 'f' float) directly
+    instead of walking pandas' dtype registry.
     """
-    if pd.api.types.is_integer_dtype(dtype):
+    kind = getattr(dtype, "kind", "O")
+    if kind in "iu":
         return "INTEGER"
-    elif pd.api.types.is_float_dtype(dtype):
+    elif kind == "f":
         return "REAL"
     else:
         # Default to TEXT for strings, objects, etc.
         return "TEXT"
 
-def create_table_dynamically(csv_file: str, db_name: str, table_name: str):
+def arrow_to_sqlite_type(arrow_type):
+    """
+    Map a pyarrow type to an appropriate SQLite type.
+    """
+    if pa.types.is_integer(arrow_type):
+        return "INTEGER"
+    elif pa.types.is_floating(arrow_type):
+        return "REAL"
+    else:
+        # Strings, timestamps, dates, etc. are stored as TEXT
+        return "TEXT"
+
+def arrow_batch_to_rows(batch):
+    """
+    Converts a pyarrow RecordBatch into an iterator of row tuples for executemany.
+    """
+    columns = [column.to_pylist() for column in batch.columns]
+    # executemany pulls one tuple at a time, so the rows are never materialized as a list
+    return zip(*columns)
+
+def polars_to_sqlite_type(polars_dtype):
+    """
+    Map a polars dtype to an appropriate SQLite type.
+    """
+    if polars_dtype.is_integer():
+        return "INTEGER"
+    elif polars_dtype.is_float():
+        return "REAL"
+    else:
+        # Strings, booleans, dates, etc. are stored as TEXT
+        return "TEXT"
+
+def open_csv_batches(csv_file: str, engine: str = CSV_ENGINES[0]):
+    """
+    Opens a CSV for streaming. Returns (columns, sqlite_types, batches), where
+    the types are inferred from the first batch (or a sample of rows) and
+    batches yields the rows of each batch as tuples ready for executemany.
+    engine picks the parser: "polars", "arrow" (pyarrow's streaming reader)
+    or "pandas" (chunked reader); see CSV_ENGINES.
+    """
+    if engine == "polars":
+        # Infer types from the first SAMPLE_ROWS rows only, then stream the file with
+        # every column read as strings so later rows can't fail type inference;
+        # SQLite's column affinity converts the values on insert
+        schema = pl.scan_csv(csv_file, infer_schema_length=SAMPLE_ROWS, null_values=NULL_VALUES).collect_schema()
+        columns = schema.names()
+        sqlite_types = [polars_to_sqlite_type(dtype) for dtype in schema.dtypes()]
+        frames = pl.scan_csv(csv_file, infer_schema=False, null_values=NULL_VALUES).collect_batches(chunk_size=CHUNK_SIZE)
+        batches = (frame.iter_rows() for frame in frames)
+        return columns, sqlite_types, batches
+
+    if engine == "arrow":
+        read_options = pacsv.ReadOptions(block_size=ARROW_BLOCK_SIZE, use_threads=True)
+        # Infer types from the first block only, then read every column as nullable
+        # strings so a later value that doesn't fit the inferred type can't abort the
+        # load; SQLite's column affinity converts the values on insert
+        sample_reader = pacsv.open_csv(
+            csv_file, read_options=read_options, convert_options=pacsv.ConvertOptions(null_values=NULL_VALUES)
+        )
+        columns = sample_reader.schema.names
+        sqlite_types = [arrow_to_sqlite_type(field.type) for field in sample_reader.schema]
+        sample_reader.close()
+        convert_options = pacsv.ConvertOptions(
+            column_types={col: pa.string() for col in columns},
+            null_values=NULL_VALUES,
+            strings_can_be_null=True,
+        )
+        reader = pacsv.open_csv(csv_file, read_options=read_options, convert_options=convert_options)
+        batches = (arrow_batch_to_rows(batch) for batch in reader)
+        return columns, sqlite_types, batches
+
+    # Infer types from a sample of rows instead of the whole file, then pin the
+    # TEXT columns so the bulk pass doesn't re-run numeric inference on them
+    sample = pd.read_csv(csv_file, nrows=SAMPLE_ROWS)
+    columns = list(sample.columns)
+    sqlite_types = [infer_sqlite_type(sample[col].dtype) for col in columns]
+    text_dtypes = {col: str for col, col_type in zip(columns, sqlite_types) if col_type == "TEXT"}
+    chunks = pd.read_csv(csv_file, chunksize=CHUNK_SIZE, dtype=text_dtypes)
+    batches = (chunk.itertuples(index=False, name=None) for chunk in chunks)
+    return columns, sqlite_types, batches
+
+def create_table_dynamically(csv_file: str, db_name: str, table_name: str, engine: str = CSV_ENGINES[0]):
     """
     Infers schema from a CSV file and creates a table dynamically in SQLite.
     """
-    # Read CSV into a DataFrame
-    df = pd.read_csv(csv_file)
-    print(f"CSV '{csv_file}' loaded successfully. Columns: {list(df.columns)}")
+    # Open the CSV as a stream of batches; the first batch drives the schema
+    try:
+        columns, sqlite_types, batches = open_csv_batches(csv_file, engine)
+    except Exception as e:
+        print(f"Error reading CSV file '{csv_file}': {str(e)}")
+        sys.exit(1)
+    print(f"CSV '{csv_file}' loaded successfully. Columns: {columns}")
 
-    # Infer column types and build CREATE TABLE statement
+    # Build CREATE TABLE statement from the inferred column types
     columns_with_types = []
-    for col in df.columns:
-        col_type = infer_sqlite_type(df[col].dtype)
+    for col, col_type in zip(columns, sqlite_types):
         # Escape column names with quotes in case of special characters/spaces
         columns_with_types.append(f'"{col}" {col_type}')
 
-    create_table_sql = f"CREATE TABLE IF NOT EXISTS {table_name} (\n  {', '.join(columns_with_types)}\n);"
+    create_table_sql = f'CREATE TABLE IF NOT EXISTS "{table_name}" (\n  {", ".join(columns_with_types)}\n);'
 
     # Connect to (or create) the SQLite database
     conn = sqlite3.connect(db_name)
+    tune_connection(conn)
     cursor = conn.cursor()
 
-    # Execute the CREATE TABLE statement
-    cursor.execute(f"DROP TABLE IF EXISTS {table_name};")  # start fresh
-    cursor.execute(create_table_sql)
-    print(f"Table '{table_name}' created with inferred schema in the database '{db_name}'.")
+    column_list = ", ".join(f'"{col}"' for col in columns)
+    placeholders = ", ".join("?" * len(columns))
+    insert_sql = f'INSERT INTO "{table_name}" ({column_list}) VALUES ({placeholders});'
 
-    # Load data into the new table using df.to_sql
-    df.to_sql(table_name, conn, if_exists='append', index=False)
+    # Recreate the table and load data batch by batch with executemany, all in a
+    # single transaction so a CSV that fails partway through leaves the old table intact
+    conn.execute("BEGIN")
+    try:
+        cursor.execute(f'DROP TABLE IF EXISTS "{table_name}";')  # start fresh
+        cursor.execute(create_table_sql)
+        for rows in batches:
+            cursor.executemany(insert_sql, rows)
+        # Refresh the query planner's statistics for the newly loaded rows
+        cursor.execute(f'ANALYZE "{table_name}";')
+        conn.commit()
+    except Exception as e:
+        # Parse errors can surface partway through the stream; nothing has been changed
+        conn.rollback()
+        conn.close()
+        print(f"Error loading CSV file '{csv_file}' into '{table_name}': {str(e)}")
+        sys.exit(1)
+    print(f"Table '{table_name}' created with inferred schema in the database '{db_name}'.")
     print(f"Data from '{csv_file}' loaded into '{table_name}' successfully.")
 
     # Return the connection for further operations
@@ -52,7 +206,7 @@ def run_example_query(conn, table_name: str):
     Runs a basic SQL query to demonstrate data retrieval.
     """
     cursor = conn.cursor()
-    query = f"SELECT * FROM {table_name} LIMIT 5;"
+    query = f'SELECT * FROM "{table_name}" LIMIT 5;'
     cursor.execute(query)
     rows = cursor.fetchall()
     print(f"\nExample query: {query}")
@@ -64,10 +218,11 @@ def main():
     parser.add_argument("--csv_file", required=True, help="Path to the input CSV file.")
     parser.add_argument("--db_name", required=True, help="Name of the SQLite database file.")
     parser.add_argument("--table_name", default="my_table", help="Name of the table to create in SQLite.")
+    parser.add_argument("--engine", choices=CSV_ENGINES, default=CSV_ENGINES[0], help="CSV parser to use (default: fastest installed).")
     args = parser.parse_args()
 
     # 1. Create table dynamically
-    conn = create_table_dynamically(args.csv_file, args.db_name, args.table_name)
+    conn = create_table_dynamically(args.csv_file, args.db_name, args.table_name, args.engine)
 
     # 2. Run a basic query for demonstration
     run_example_query(conn, args.table_name)
@@ -3,49 +3,229 @@ import pandas as pd
 import argparse
 import sys
 import os
+import atexit
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:
+    # pyarrow is optional; without it CSVs are parsed with pandas
+    pa = None
+
+try:
+    import polars as pl
+except ImportError:
+    # polars is optional as well
+    pl = None
+
+# CSV parsers available in this environment, fastest first
+CSV_ENGINES = [name for name, module in (("polars", pl), ("arrow", pa), ("pandas", pd)) if module is not None]
 
 ERROR_LOG_FILE = "error_log.txt"
 
+# Bytes of log output buffered before they are written to disk
+LOG_BUFFER_SIZE = 1 << 16
+
+# Buffered append handle for ERROR_LOG_FILE, opened on first use
+log_file = None
+
+# Number of CSV rows held in memory (and inserted) at a time
+CHUNK_SIZE = 100_000
+
+# Number of leading CSV rows pandas reads to infer column types
+SAMPLE_ROWS = 10_000
+
+# Cell values read as missing (NULL); pandas' default na_values, passed to the
+# polars and pyarrow readers so every engine stores the same values
+NULL_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+# Bytes of CSV parsed per pyarrow batch
+ARROW_BLOCK_SIZE = 8 << 20
+
+# PRAGMAs applied to every connection before loading or querying data
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-200000",
+    "mmap_size=268435456",
+)
+
+def tune_connection(conn):
+    """
+    Applies PRAGMAs that speed up bulk inserts and reads:
+    WAL journaling, fewer fsyncs, in-memory temp storage,
+    a larger page cache and memory-mapped I/O.
+    """
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma};")
+
 def log_error(message: str):
     """
     Logs an error or warning message to error_log.txt.
+    The file is opened once and flushed when the program exits.
+    """
+    global log_file
+    if log_file is None:
+        log_file = open(ERROR_LOG_FILE, "a", buffering=LOG_BUFFER_SIZE)
+        atexit.register(log_file.close)
+    log_file.write(message)
+    log_file.write("\n")
+
+def infer_sqlite_type(dtype):
+    """
+    Map a pandas dtype to an appropriate SQLite type.
+    Reads the numpy kind code ('i'/'u' integer, 'f' float) directly
+    instead of walking pandas' dtype registry.
+    """
+    kind = getattr(dtype, "kind", "O")
+    if kind in "iu":
+        return "INTEGER"
+    elif kind == "f":
+        return "REAL"
+    else:
+        # Default to TEXT for strings, objects, etc.
+        return "TEXT"
+
+def arrow_to_sqlite_type(arrow_type):
+    """
+    Map a pyarrow type to an appropriate SQLite type.
+    """
+    if pa.types.is_integer(arrow_type):
+        return "INTEGER"
+    elif pa.types.is_floating(arrow_type):
+        return "REAL"
+    else:
+        # Strings, timestamps, dates, etc. are stored as TEXT
+        return "TEXT"
+
+def arrow_batch_to_rows(batch):
+    """
+    Converts a pyarrow RecordBatch into an iterator of row tuples for executemany.
+    """
+    columns = [column.to_pylist() for column in batch.columns]
+    # executemany pulls one tuple at a time, so the rows are never materialized as a list
+    return zip(*columns)
+
+def polars_to_sqlite_type(polars_dtype):
+    """
+    Map a polars dtype to an appropriate SQLite type.
+    """
+    if polars_dtype.is_integer():
+        return "INTEGER"
+    elif polars_dtype.is_float():
+        return "REAL"
+    else:
+        # Strings, booleans, dates, etc. are stored as TEXT
+        return "TEXT"
+
+def open_csv_batches(csv_file: str, engine: str = CSV_ENGINES[0]):
+    """
+    Opens a CSV for streaming. Returns (columns, sqlite_types, batches), where
+    the types are inferred from the first batch (or a sample of rows) and
+    batches yields the rows of each batch as tuples ready for executemany.
+    engine picks the parser: "polars", "arrow" (pyarrow's streaming reader)
+    or "pandas" (chunked reader); see CSV_ENGINES.
     """
-    with open(ERROR_LOG_FILE, "a") as f:
-        f.write(message + "\n")
+    if engine == "polars":
+        # Infer types from the first SAMPLE_ROWS rows only, then stream the file with
+        # every column read as strings so later rows can't fail type inference;
+        # SQLite's column affinity converts the values on insert
+        schema = pl.scan_csv(csv_file, infer_schema_length=SAMPLE_ROWS, null_values=NULL_VALUES).collect_schema()
+        columns = schema.names()
+        sqlite_types = [polars_to_sqlite_type(dtype) for dtype in schema.dtypes()]
+        frames = pl.scan_csv(csv_file, infer_schema=False, null_values=NULL_VALUES).collect_batches(chunk_size=CHUNK_SIZE)
+        batches = (frame.iter_rows() for frame in frames)
+        return columns, sqlite_types, batches
+
+    if engine == "arrow":
+        read_options = pacsv.ReadOptions(block_size=ARROW_BLOCK_SIZE, use_threads=True)
+        # Infer types from the first block only, then read every column as nullable
+        # strings so a later value that doesn't fit the inferred type can't abort the
+        # load; SQLite's column affinity converts the values on insert
+        sample_reader = pacsv.open_csv(
+            csv_file, read_options=read_options, convert_options=pacsv.ConvertOptions(null_values=NULL_VALUES)
+        )
+        columns = sample_reader.schema.names
+        sqlite_types = [arrow_to_sqlite_type(field.type) for field in sample_reader.schema]
+        sample_reader.close()
+        convert_options = pacsv.ConvertOptions(
+            column_types={col: pa.string() for col in columns},
+            null_values=NULL_VALUES,
+            strings_can_be_null=True,
+        )
+        reader = pacsv.open_csv(csv_file, read_options=read_options, convert_options=convert_options)
+        batches = (arrow_batch_to_rows(batch) for batch in reader)
+        return columns, sqlite_types, batches
+
+    # Infer types from a sample of rows instead of the whole file, then pin the
+    # TEXT columns so the bulk pass doesn't re-run numeric inference on them
+    sample = pd.read_csv(csv_file, nrows=SAMPLE_ROWS)
+    columns = list(sample.columns)
+    sqlite_types = [infer_sqlite_type(sample[col].dtype) for col in columns]
+    text_dtypes = {col: str for col, col_type in zip(columns, sqlite_types) if col_type == "TEXT"}
+    chunks = pd.read_csv(csv_file, chunksize=CHUNK_SIZE, dtype=text_dtypes)
+    batches = (chunk.itertuples(index=False, name=None) for chunk in chunks)
+    return columns, sqlite_types, batches
 
 def get_existing_table_schema(conn, table_name: str):
     """
     Retrieves the schema (column names & types) of an existing table
-    using PRAGMA table_info. Returns a dict: {column_name: column_type}
+    using pragma_table_info. Returns a dict: {column_name: column_type}
     If the table does not exist, returns an empty dict.
     """
     cursor = conn.cursor()
-    cursor.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}';")
+    # Bound parameters let sqlite3 reuse the prepared statements across calls
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=? LIMIT 1;", (table_name,))
     result = cursor.fetchone()
     
     if not result:
         return {}
     
-    cursor.execute(f"PRAGMA table_info('{table_name}')")
-    rows = cursor.fetchall()
-    # PRAGMA table_info returns: (cid, name, type, notnull, dflt_value, pk)
-    schema = {}
-    for row in rows:
-        col_name = row[1]
-        col_type = row[2]
-        schema[col_name] = col_type
-    return schema
-
-def create_table_with_prompt(csv_file: str, db_name: str, table_name: str):
+    cursor.execute("SELECT name, type FROM pragma_table_info(?);", (table_name,))
+    return dict(cursor.fetchall())
+
+def drop_table_indexes(conn, table_name: str):
+    """
+    Drops the explicitly created indexes on a table and returns their
+    CREATE INDEX statements so they can be rebuilt after a bulk load.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL;",
+        (table_name,),
+    )
+    indexes = cursor.fetchall()
+    for index_name, _ in indexes:
+        cursor.execute(f'DROP INDEX "{index_name}";')
+    return [index_sql for _, index_sql in indexes]
+
+def next_free_table_name(conn, table_name: str):
+    """
+    Returns the first of table_name_2, table_name_3, ... that isn't taken.
+    """
+    suffix = 2
+    while get_existing_table_schema(conn, f"{table_name}_{suffix}"):
+        suffix += 1
+    return f"{table_name}_{suffix}"
+
+def create_table_with_prompt(csv_file: str, db_name: str, table_name: str, engine: str = CSV_ENGINES[0], on_conflict: str = None):
     """
     Reads CSV and attempts to create/import into the specified table.
     If table already exists, uses PRAGMA table_info() to compare schemas
-    and prompts user to overwrite, rename, or skip.
+    and prompts user to overwrite, rename, or skip. on_conflict
+    ("overwrite", "rename" or "skip") preselects the action instead;
+    without it, non-interactive runs skip.
+    Returns the connection and the name of the table the CSV went into (which
+    differs from table_name after a rename), or (None, None) if nothing was imported.
     """
-    # 1) Read CSV into DataFrame
+    # 1) Open the CSV as a stream of batches; the first batch drives the schema
     try:
-        df = pd.read_csv(csv_file)
-        print(f"CSV '{csv_file}' loaded successfully. Columns: {list(df.columns)}")
+        columns, sqlite_types, batches = open_csv_batches(csv_file, engine)
+        print(f"CSV '{csv_file}' loaded successfully. Columns: {columns}")
     except Exception as e:
         error_msg = f"Error reading CSV file '{csv_file}': {str(e)}"
         print(error_msg)
@@ -54,95 +234,121 @@ def create_table_with_prompt(csv_file: str, db_name: str, table_name: str):
 
     # 2) Connect to (or create) SQLite DB
     conn = sqlite3.connect(db_name)
+    tune_connection(conn)
     cursor = conn.cursor()
 
     # 3) Check if the table already exists and gather its schema
+    overwrite = False
     existing_schema = get_existing_table_schema(conn, table_name)
     if existing_schema:
-        # Compare columns in CSV vs existing table
-        df_columns = list(df.columns)
-        existing_columns = list(existing_schema.keys())
+        # Compare columns in CSV vs existing table (frozenset of a dict iterates its keys)
+        existing = frozenset(existing_schema)
+        incoming = frozenset(columns)
         
         # Only do something if there’s a difference. (Otherwise, we can just append.)
-        if set(df_columns) != set(existing_columns):
+        if existing != incoming:
             print(f"Table '{table_name}' already exists with a different schema.")
-            print(f"Existing columns: {existing_columns}")
-            print(f"CSV columns: {df_columns}")
+            print(f"Existing columns: {list(existing_schema)}")
+            print(f"CSV columns: {list(columns)}")
             
-            print("\nChoose an option:")
-            print("(O)verwrite existing table (will drop and recreate)")
-            print("(R)ename new table before import")
-            print("(S)kip importing this CSV")
-            
-            choice = input("Enter O/R/S: ").strip().upper()
+            interactive = on_conflict is None and sys.stdin.isatty()
+            if on_conflict:
+                # Action preselected on the command line
+                print(f"Using --on_conflict {on_conflict}.")
+                choice = on_conflict[0].upper()
+            elif interactive:
+                print("\nChoose an option:")
+                print("(O)verwrite existing table (will drop and recreate)")
+                print("(R)ename new table before import")
+                print("(S)kip importing this CSV")
+                
+                choice = input("Enter O/R/S: ").strip().upper()
+            else:
+                # Nobody to ask (e.g. a scripted run); leave the existing table alone
+                skip_msg = (
+                    f"Skipped importing '{csv_file}' into '{table_name}': columns differ "
+                    "and no --on_conflict was given for a non-interactive run."
+                )
+                print(skip_msg)
+                log_error(skip_msg)
+                return None, None
 
             if choice == "O":
-                # Overwrite
+                # Overwrite (the table is dropped inside the load transaction below)
                 print(f"Overwriting table '{table_name}'...")
-                cursor.execute(f"DROP TABLE IF EXISTS {table_name};")
-                conn.commit()
+                overwrite = True
             elif choice == "R":
-                # Prompt for new name
-                new_table_name = input("Enter a new table name: ").strip()
+                # Prompt for new name, or pick a free one when not interactive
+                if interactive:
+                    new_table_name = input("Enter a new table name: ").strip()
+                else:
+                    new_table_name = next_free_table_name(conn, table_name)
                 if new_table_name:
                     table_name = new_table_name
                     print(f"Proceeding with new table name '{table_name}'.")
                 else:
                     print("Invalid new table name. Skipping import.")
                     log_error("User provided invalid table name for rename option.")
-                    return
+                    return None, None
             else:
                 # Skip or any other input
                 skip_msg = f"User chose to skip importing '{csv_file}' into '{table_name}'."
                 print(skip_msg)
                 log_error(skip_msg)
-                return
+                return None, None
     
-    # 4) Infer column types from DataFrame
-    def infer_sqlite_type(dtype):
-        if pd.api.types.is_integer_dtype(dtype):
-            return "INTEGER"
-        elif pd.api.types.is_float_dtype(dtype):
-            return "REAL"
-        else:
-            # Default to TEXT
-            return "TEXT"
-
+    # 4) Pair column names with the inferred types
     columns_with_types = []
-    for col in df.columns:
-        col_type = infer_sqlite_type(df[col].dtype)
+    for col, col_type in zip(columns, sqlite_types):
         columns_with_types.append(f'"{col}" {col_type}')
 
-    create_table_sql = f"CREATE TABLE IF NOT EXISTS {table_name} (\n  {', '.join(columns_with_types)}\n);"
+    create_table_sql = f'CREATE TABLE IF NOT EXISTS "{table_name}" (\n  {", ".join(columns_with_types)}\n);'
     
-    # 5) Create table if it doesn't already exist
+    # 5) Create table if it doesn't already exist. This and the inserts below run
+    # in one transaction, so a failed load leaves any existing table as it was
+    conn.execute("BEGIN")
     try:
+        if overwrite:
+            cursor.execute(f'DROP TABLE IF EXISTS "{table_name}";')
         cursor.execute(create_table_sql)
-        conn.commit()
         print(f"Table '{table_name}' is ready.")
     except Exception as e:
+        conn.rollback()
         error_msg = f"Error creating table '{table_name}': {str(e)}"
         print(error_msg)
         log_error(error_msg)
-        return
+        return None, None
 
-    # 6) Insert data into the table (append if table already had a matching schema)
+    # 6) Insert data batch by batch (append if table already had a matching schema)
+    column_list = ", ".join(f'"{col}"' for col in columns)
+    placeholders = ", ".join("?" * len(columns))
+    insert_sql = f'INSERT INTO "{table_name}" ({column_list}) VALUES ({placeholders});'
     try:
-        df.to_sql(table_name, conn, if_exists='append', index=False)
+        # Drop indexes for the bulk load and rebuild them once at the end;
+        # a rollback restores them if anything fails in between
+        index_sqls = drop_table_indexes(conn, table_name)
+        for rows in batches:
+            cursor.executemany(insert_sql, rows)
+        for index_sql in index_sqls:
+            cursor.execute(index_sql)
+        # Refresh the query planner's statistics for the newly loaded rows
+        cursor.execute(f'ANALYZE "{table_name}";')
+        conn.commit()
         print(f"Data from '{csv_file}' loaded into table '{table_name}' successfully.")
     except Exception as e:
+        conn.rollback()
         error_msg = f"Error inserting data into '{table_name}': {str(e)}"
         print(error_msg)
         log_error(error_msg)
 
-    return conn
+    return conn, table_name
 
 def run_example_query(conn, table_name: str):
     """
     Runs a basic SQL query to show the first 5 rows.
     """
     cursor = conn.cursor()
-    query = f"SELECT * FROM {table_name} LIMIT 5;"
+    query = f'SELECT * FROM "{table_name}" LIMIT 5;'
     try:
         cursor.execute(query)
         rows = cursor.fetchall()
@@ -159,14 +365,16 @@ def main():
     parser.add_argument("--csv_file", required=True, help="Path to the input CSV file.")
     parser.add_argument("--db_name", required=True, help="Name of the SQLite database file.")
     parser.add_argument("--table_name", default="my_table", help="Name of the table in SQLite.")
+    parser.add_argument("--on_conflict", choices=("overwrite", "rename", "skip"), default=None, help="Action when the table exists with different columns (default: ask when interactive, otherwise skip).")
+    parser.add_argument("--engine", choices=CSV_ENGINES, default=CSV_ENGINES[0], help="CSV parser to use (default: fastest installed).")
     args = parser.parse_args()
 
     # Create or update table with prompts on conflicts
-    conn = create_table_with_prompt(args.csv_file, args.db_name, args.table_name)
+    conn, table_name = create_table_with_prompt(args.csv_file, args.db_name, args.table_name, args.engine, args.on_conflict)
     
     if conn:
-        # Run an example query
-        run_example_query(conn, args.table_name)
+        # Run an example query on the table the data went into (it may have been renamed)
+        run_example_query(conn, table_name)
         conn.close()
 
 if __name__ == "__main__":
@@ -3,34 +3,209 @@ import pandas as pd
 import argparse
 import os
 import sys
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:
+    # pyarrow is optional; without it CSVs are parsed with pandas
+    pa = None
+
+try:
+    import polars as pl
+except ImportError:
+    # polars is optional as well
+    pl = None
+
+# CSV parsers available in this environment, fastest first
+CSV_ENGINES = [name for name, module in (("polars", pl), ("arrow", pa), ("pandas", pd)) if module is not None]
+
+# Number of CSV rows held in memory (and inserted) at a time
+CHUNK_SIZE = 100_000
+
+# Number of leading CSV rows pandas reads to infer column types
+SAMPLE_ROWS = 10_000
+
+# Cell values read as missing (NULL); pandas' default na_values, passed to the
+# polars and pyarrow readers so every engine stores the same values
+NULL_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
+# Most shard databases --multi_csv creates; they are all attached to the main
+# connection at once, and SQLite allows 10 attached databases by default
+MAX_SHARDS = 8
+
+# Number of result rows fetched at a time by run_sql_query
+FETCH_BATCH_SIZE = 1000
+
+# Bytes of CSV parsed per pyarrow batch
+ARROW_BLOCK_SIZE = 8 << 20
+
+# Prepared statements sqlite3 keeps per connection, keyed by SQL text, so
+# repeated REPL queries skip re-parsing
+STATEMENT_CACHE_SIZE = 512
+
+# PRAGMAs applied to every connection before loading or querying data
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-200000",
+    "mmap_size=268435456",
+)
+
+def tune_connection(conn):
+    """
+    Applies PRAGMAs that speed up bulk inserts and reads:
+    WAL journaling, fewer fsyncs, in-memory temp storage,
+    a larger page cache and memory-mapped I/O.
+    """
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma};")
 
 def connect_to_db(db_name: str):
     """
     Connects to or creates a SQLite database.
     """
-    conn = sqlite3.connect(db_name)
+    conn = sqlite3.connect(db_name, cached_statements=STATEMENT_CACHE_SIZE)
+    tune_connection(conn)
     print(f"Connected to database '{db_name}'.")
     return conn
 
-def load_csv_into_table(conn, csv_file: str, table_name: str):
+def infer_sqlite_type(dtype):
+    """
+    Map a pandas dtype to an appropriate SQLite type.
+    Reads the numpy kind code ('i'/'u' integer, 'f' float) directly
+    instead of walking pandas' dtype registry.
+    """
+    kind = getattr(dtype, "kind", "O")
+    if kind in "iu":
+        return "INTEGER"
+    elif kind == "f":
+        return "REAL"
+    else:
+        # Default to TEXT for strings, objects, etc.
+        return "TEXT"
+
+def arrow_to_sqlite_type(arrow_type):
+    """
+    Map a pyarrow type to an appropriate SQLite type.
+    """
+    if pa.types.is_integer(arrow_type):
+        return "INTEGER"
+    elif pa.types.is_floating(arrow_type):
+        return "REAL"
+    else:
+        # Strings, timestamps, dates, etc. are stored as TEXT
+        return "TEXT"
+
+def arrow_batch_to_rows(batch):
+    """
+    Converts a pyarrow RecordBatch into an iterator of row tuples for executemany.
+    """
+    columns = [column.to_pylist() for column in batch.columns]
+    # executemany pulls one tuple at a time, so the rows are never materialized as a list
+    return zip(*columns)
+
+def polars_to_sqlite_type(polars_dtype):
+    """
+    Map a polars dtype to an appropriate SQLite type.
+    """
+    if polars_dtype.is_integer():
+        return "INTEGER"
+    elif polars_dtype.is_float():
+        return "REAL"
+    else:
+        # Strings, booleans, dates, etc. are stored as TEXT
+        return "TEXT"
+
+def open_csv_batches(csv_file: str, engine: str = CSV_ENGINES[0]):
+    """
+    Opens a CSV for streaming. Returns (columns, sqlite_types, batches), where
+    the types are inferred from the first batch (or a sample of rows) and
+    batches yields the rows of each batch as tuples ready for executemany.
+    engine picks the parser: "polars", "arrow" (pyarrow's streaming reader)
+    or "pandas" (chunked reader); see CSV_ENGINES.
+    """
+    if engine == "polars":
+        # Infer types from the first SAMPLE_ROWS rows only, then stream the file with
+        # every column read as strings so later rows can't fail type inference;
+        # SQLite's column affinity converts the values on insert
+        schema = pl.scan_csv(csv_file, infer_schema_length=SAMPLE_ROWS, null_values=NULL_VALUES).collect_schema()
+        columns = schema.names()
+        sqlite_types = [polars_to_sqlite_type(dtype) for dtype in schema.dtypes()]
+        frames = pl.scan_csv(csv_file, infer_schema=False, null_values=NULL_VALUES).collect_batches(chunk_size=CHUNK_SIZE)
+        batches = (frame.iter_rows() for frame in frames)
+        return columns, sqlite_types, batches
+
+    if engine == "arrow":
+        read_options = pacsv.ReadOptions(block_size=ARROW_BLOCK_SIZE, use_threads=True)
+        # Infer types from the first block only, then read every column as nullable
+        # strings so a later value that doesn't fit the inferred type can't abort the
+        # load; SQLite's column affinity converts the values on insert
+        sample_reader = pacsv.open_csv(
+            csv_file, read_options=read_options, convert_options=pacsv.ConvertOptions(null_values=NULL_VALUES)
+        )
+        columns = sample_reader.schema.names
+        sqlite_types = [arrow_to_sqlite_type(field.type) for field in sample_reader.schema]
+        sample_reader.close()
+        convert_options = pacsv.ConvertOptions(
+            column_types={col: pa.string() for col in columns},
+            null_values=NULL_VALUES,
+            strings_can_be_null=True,
+        )
+        reader = pacsv.open_csv(csv_file, read_options=read_options, convert_options=convert_options)
+        batches = (arrow_batch_to_rows(batch) for batch in reader)
+        return columns, sqlite_types, batches
+
+    # Infer types from a sample of rows instead of the whole file, then pin the
+    # TEXT columns so the bulk pass doesn't re-run numeric inference on them
+    sample = pd.read_csv(csv_file, nrows=SAMPLE_ROWS)
+    columns = list(sample.columns)
+    sqlite_types = [infer_sqlite_type(sample[col].dtype) for col in columns]
+    text_dtypes = {col: str for col, col_type in zip(columns, sqlite_types) if col_type == "TEXT"}
+    chunks = pd.read_csv(csv_file, chunksize=CHUNK_SIZE, dtype=text_dtypes)
+    batches = (chunk.itertuples(index=False, name=None) for chunk in chunks)
+    return columns, sqlite_types, batches
+
+def drop_table_indexes(conn, table_name: str):
+    """
+    Drops the explicitly created indexes on a table and returns their
+    CREATE INDEX statements so they can be rebuilt after a bulk load.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL;",
+        (table_name,),
+    )
+    indexes = cursor.fetchall()
+    for index_name, _ in indexes:
+        cursor.execute(f'DROP INDEX "{index_name}";')
+    return [index_sql for _, index_sql in indexes]
+
+def load_csv_into_table(conn, csv_file: str, table_name: str, engine: str = CSV_ENGINES[0], analyze: bool = True):
     """
     Loads a CSV into a specified table. By default, it infers a schema
     dynamically and appends the data. If the table doesn't exist, it will be created.
+    With analyze=True the table's planner statistics are refreshed afterwards.
+    Returns True if the CSV was loaded.
     """
     try:
-        df = pd.read_csv(csv_file)
+        # Stream the CSV in batches; the first batch drives schema inference
+        columns, sqlite_types, batches = open_csv_batches(csv_file, engine)
     except Exception as e:
         print(f"Error: Could not read CSV file '{csv_file}' - {e}")
-        return
-
-    # Infer column types
-    def infer_sqlite_type(dtype):
-        if pd.api.types.is_integer_dtype(dtype):
-            return "INTEGER"
-        elif pd.api.types.is_float_dtype(dtype):
-            return "REAL"
-        else:
-            return "TEXT"
+        return False
+
+    # Commit work left pending by earlier REPL statements (e.g. "query INSERT ...")
+    # so the load's own transaction can begin without discarding it
+    if conn.in_transaction:
+        conn.commit()
 
     # Build CREATE TABLE statement if table doesn't exist
     cursor = conn.cursor()
@@ -41,35 +216,162 @@ def load_csv_into_table(conn, csv_file: str, table_name: str):
     if not existing_table:
         # Table doesn't exist, create it
         columns_with_types = []
-        for col in df.columns:
-            col_type = infer_sqlite_type(df[col].dtype)
+        for col, col_type in zip(columns, sqlite_types):
             columns_with_types.append(f'"{col}" {col_type}')
 
-        create_table_sql = f"CREATE TABLE IF NOT EXISTS {table_name} (\n  {', '.join(columns_with_types)}\n);"
+        create_table_sql = f'CREATE TABLE IF NOT EXISTS "{table_name}" (\n  {", ".join(columns_with_types)}\n);'
+        # Created inside the load transaction so a CSV that fails to load leaves no empty table
+        conn.execute("BEGIN")
         try:
             cursor.execute(create_table_sql)
-            conn.commit()
             print(f"Created table '{table_name}'.")
         except Exception as e:
+            conn.rollback()
             print(f"Error creating table '{table_name}': {str(e)}")
-            return
+            return False
     else:
         # If table exists, we are appending
         print(f"Table '{table_name}' already exists, appending data...")
+        conn.execute("BEGIN")
 
-    # Insert data
+    # Insert data batch by batch with executemany inside the same transaction
+    column_list = ", ".join(f'"{col}"' for col in columns)
+    placeholders = ", ".join("?" * len(columns))
+    insert_sql = f'INSERT INTO "{table_name}" ({column_list}) VALUES ({placeholders});'
     try:
-        df.to_sql(table_name, conn, if_exists='append', index=False)
+        # Drop indexes for the bulk load and rebuild them once at the end;
+        # a rollback restores them if anything fails in between
+        index_sqls = drop_table_indexes(conn, table_name)
+        for rows in batches:
+            cursor.executemany(insert_sql, rows)
+        for index_sql in index_sqls:
+            cursor.execute(index_sql)
+        if analyze:
+            # Refresh the query planner's statistics for the newly loaded rows
+            cursor.execute(f'ANALYZE "{table_name}";')
+        conn.commit()
         print(f"Loaded CSV '{csv_file}' into table '{table_name}'.")
+        return True
     except Exception as e:
+        conn.rollback()
         print(f"Error inserting data into '{table_name}': {str(e)}")
+        return False
+
+def ingest_shard(csv_files, shard_db: str, table_name: str, engine: str):
+    """
+    Worker for parallel loading: loads its share of the CSVs into its own shard
+    database. Returns how many of them were loaded.
+    """
+    conn = sqlite3.connect(shard_db)
+    tune_connection(conn)
+    # Statistics are gathered once on the merged table, not per shard
+    loaded = sum(load_csv_into_table(conn, csv_file, table_name, engine, analyze=False) for csv_file in csv_files)
+    conn.close()
+    return loaded
+
+def merge_shard(conn, shard_name: str, table_name: str):
+    """
+    Copies the table of the shard database attached as shard_name into the main
+    database with INSERT ... SELECT, creating the table from the shard's schema
+    if it doesn't exist yet. Runs inside the caller's transaction. Returns False
+    if the shard has no table (none of its CSVs could be loaded).
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT sql FROM {shard_name}.sqlite_master WHERE type='table' AND name=?;", (table_name,))
+    shard_table = cursor.fetchone()
+    if not shard_table:
+        # The worker couldn't load these CSVs and has already reported why
+        return False
+
+    cursor.execute("SELECT name FROM main.sqlite_master WHERE type='table' AND name=?;", (table_name,))
+    if not cursor.fetchone():
+        cursor.execute(shard_table[0])
+
+    cursor.execute(f"SELECT name FROM pragma_table_info(?, '{shard_name}');", (table_name,))
+    column_list = ", ".join(f'"{row[0]}"' for row in cursor.fetchall())
+    cursor.execute(
+        f'INSERT INTO main."{table_name}" ({column_list}) '
+        f'SELECT {column_list} FROM {shard_name}."{table_name}";'
+    )
+    return True
+
+def load_csvs_in_parallel(conn, csv_files, table_name: str, engine: str = CSV_ENGINES[0]):
+    """
+    Loads several CSVs into one table. The CSVs are split across up to MAX_SHARDS
+    worker processes, each parsing and loading its files into its own temporary
+    shard database. This (single) writer then merges the shards into the main
+    database in one transaction; a shard that doesn't fit the table is rolled
+    back to its savepoint and reported, and the others are kept.
+    """
+    shard_count = min(len(csv_files), MAX_SHARDS)
+    shard_files = [csv_files[i::shard_count] for i in range(shard_count)]
+    with tempfile.TemporaryDirectory() as shard_dir:
+        shard_dbs = [os.path.join(shard_dir, f"shard_{i}.db") for i in range(shard_count)]
+        # Spawn rather than fork: forking after polars/pyarrow start their thread pools can deadlock
+        with ProcessPoolExecutor(max_workers=shard_count, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [
+                executor.submit(ingest_shard, files, shard_db, table_name, engine)
+                for files, shard_db in zip(shard_files, shard_dbs)
+            ]
+            shard_loaded = []
+            for files, future in zip(shard_files, futures):
+                try:
+                    shard_loaded.append(future.result())
+                except Exception as e:
+                    print(f"Error loading {', '.join(files)} in a worker process: {str(e)}")
+                    shard_loaded.append(0)
+
+        # Commit work left pending by earlier REPL statements before the merge begins
+        if conn.in_transaction:
+            conn.commit()
+
+        # Drop indexes, merge the shards, rebuild the indexes and refresh statistics
+        # in a single transaction; any failure outside a shard's merge rolls all of it back
+        shard_names = []
+        loaded = 0
+        conn.execute("BEGIN")
+        try:
+            index_sqls = drop_table_indexes(conn, table_name)
+            for i, (files, shard_db) in enumerate(zip(shard_files, shard_dbs)):
+                if not shard_loaded[i]:
+                    # Nothing loaded into this shard (or its worker failed); already reported
+                    continue
+                shard_name = f"shard_{i}"
+                conn.execute(f"ATTACH DATABASE ? AS {shard_name};", (shard_db,))
+                shard_names.append(shard_name)
+                # A savepoint per shard so one that doesn't fit the table is skipped
+                # without undoing the shards merged before it
+                conn.execute("SAVEPOINT merge_shard;")
+                try:
+                    if merge_shard(conn, shard_name, table_name):
+                        loaded += shard_loaded[i]
+                    conn.execute("RELEASE merge_shard;")
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO merge_shard;")
+                    conn.execute("RELEASE merge_shard;")
+                    print(f"Skipping {', '.join(files)}: could not merge into '{table_name}' - {str(e)}")
+            for index_sql in index_sqls:
+                conn.execute(index_sql)
+            if loaded:
+                # Refresh the query planner's statistics for the newly loaded rows
+                conn.execute(f'ANALYZE "{table_name}";')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"Error merging CSV files into '{table_name}': {str(e)}")
+            loaded = 0
+        finally:
+            for shard_name in shard_names:
+                conn.execute(f"DETACH DATABASE {shard_name};")
+    print(f"Loaded {loaded} of {len(csv_files)} CSV files into table '{table_name}'.")
 
 def list_tables(conn):
     """
-    Lists all tables in the connected SQLite database by querying sqlite_master.
+    Lists the user tables in the connected SQLite database by querying sqlite_master
+    (internal sqlite_% tables such as ANALYZE's sqlite_stat1 are left out).
     """
     cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name;")
     tables = cursor.fetchall()
     if not tables:
         print("No tables found in the database.")
@@ -85,21 +387,28 @@ def run_sql_query(conn, query_str: str):
     cursor = conn.cursor()
     try:
         cursor.execute(query_str)
-        rows = cursor.fetchall()
-        # Print up to some limit to avoid flooding console (or just print all).
-        for row in rows:
-            print(row)
+        # Fetch in batches so large results never sit in memory all at once
+        cursor.arraysize = FETCH_BATCH_SIZE
+        while rows := cursor.fetchmany():
+            for row in rows:
+                print(row)
     except Exception as e:
         print(f"Error executing query: {str(e)}")
 
 def main():
     parser = argparse.ArgumentParser(description="Step 4: Simple interactive CLI to load CSVs, run queries, and list tables.")
     parser.add_argument("--db_name", required=True, help="Name of the SQLite database file.")
+    parser.add_argument("--multi_csv", nargs="+", metavar="CSV_FILE", help="Load several CSV files in parallel into --table_name before starting the CLI.")
+    parser.add_argument("--table_name", default="my_table", help="Table that --multi_csv loads into.")
+    parser.add_argument("--engine", choices=CSV_ENGINES, default=CSV_ENGINES[0], help="CSV parser to use (default: fastest installed).")
     args = parser.parse_args()
 
     # Connect or create the DB
     conn = connect_to_db(args.db_name)
 
+    if args.multi_csv:
+        load_csvs_in_parallel(conn, args.multi_csv, args.table_name, args.engine)
+
     print("\nWelcome to the ChatSheetsAI CLI")
     print("Type 'help' for a list of commands.\n")
 
@@ -120,6 +429,8 @@ def main():
         
         elif command == "exit":
             print("Exiting ChatSheetAI CLI.")
+            # Let SQLite refresh any statistics that have gone stale during the session
+            conn.execute("PRAGMA optimize;")
             break
         
         elif command == "list":
@@ -139,7 +450,7 @@ def main():
                 print("Usage: load <csv_file> <table_name>")
                 continue
             csv_file, table_name = load_args[0], load_args[1]
-            load_csv_into_table(conn, csv_file, table_name)
+            load_csv_into_table(conn, csv_file, table_name, args.engine)
 
         elif command == "query":
             if len(cmd_parts) < 2:
@@ -3,11 +3,49 @@ import pandas as pd
 import argparse
 import textwrap
 import os
+import re
+import asyncio
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 client = None
 
+# Formatted schema sent to the LLM; rebuilt only after schema-changing SQL
+schema_cache = None
+
+# Lines containing code fences, dropped before parsing an AI response
+CODE_FENCE_RE = re.compile(r"^.*```.*(?:\n|$)", re.MULTILINE)
+
+# "SQL Query" heading line, the SQL, then an optional "Explanation" heading line
+# and the explanation text
+AI_RESPONSE_RE = re.compile(
+    r"^.*sql query.*\n(?P<sql>(?s:.*?))(?:^.*explanation.*(?:\n|$)(?P<explanation>(?s:.*)))?\Z",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# An "Explanation" heading line and the text after it, for responses without a
+# "SQL Query" heading
+EXPLANATION_RE = re.compile(r"^.*explanation.*(?:\n|$)(?P<explanation>(?s:.*))", re.IGNORECASE | re.MULTILINE)
+
+# Separator between several prompts given to a single "ask" command
+ASK_SEPARATOR = ";;"
+
+# Leading keywords of statements that can change the schema
+SCHEMA_CHANGING_KEYWORDS = ("CREATE", "DROP", "ALTER", "ATTACH", "DETACH")
+
+# Prepared statements sqlite3 keeps per connection, keyed by SQL text, so
+# repeated REPL queries skip re-parsing
+STATEMENT_CACHE_SIZE = 512
+
+# PRAGMAs applied to every connection before loading or querying data
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-200000",
+    "mmap_size=268435456",
+)
+
 def set_openai_api_key():
     """
     Retrieves OpenAI API key from environment variable or prompts user to enter it.
@@ -19,15 +57,25 @@ def set_openai_api_key():
         print("OpenAI API key not found in environment. Please set OPENAI_API_KEY or hardcode it for testing.")
     
     if key:
-        client = OpenAI(api_key=key)
+        client = AsyncOpenAI(api_key=key)
     else:
         client = None
 
+def tune_connection(conn):
+    """
+    Applies PRAGMAs that speed up bulk inserts and reads:
+    WAL journaling, fewer fsyncs, in-memory temp storage,
+    a larger page cache and memory-mapped I/O.
+    """
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(f"PRAGMA {pragma};")
+
 def connect_to_db(db_name: str):
     """
     Connects to (or creates) a SQLite database.
     """
-    conn = sqlite3.connect(db_name)
+    conn = sqlite3.connect(db_name, cached_statements=STATEMENT_CACHE_SIZE)
+    tune_connection(conn)
     print(f"Connected to database '{db_name}'.")
     return conn
 
@@ -36,7 +84,7 @@ def list_tables(conn):
     Lists all tables in the database.
     """
     cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name;")
     tables = cursor.fetchall()
     if not tables:
         print("No tables found in the database.")
@@ -49,27 +97,44 @@ def get_db_schema(conn):
     """
     Gathers table info (names & columns) from the database.
     Returns a structured string used for LLM context.
+    The result is cached until a schema-changing statement is executed.
     """
+    global schema_cache
+    if schema_cache is not None:
+        return schema_cache
+
+    # One round-trip for every table's columns instead of a PRAGMA per table
     cursor = conn.cursor()
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
-    table_names = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT m.name, p.name, p.type FROM sqlite_master AS m "
+        "JOIN pragma_table_info(m.name) AS p "
+        "WHERE m.type='table' AND m.name NOT LIKE 'sqlite_%' ORDER BY m.name, p.cid;"
+    )
+    tables = {}
+    for table, col_name, col_type in cursor.fetchall():
+        tables.setdefault(table, []).append(f"{col_name} {col_type}")
 
-    schema_info = []
-    for table in table_names:
-        cursor.execute(f"PRAGMA table_info('{table}')")
-        columns = cursor.fetchall()
-        # PRAGMA table_info returns: (cid, name, type, notnull, dflt_value, pk)
-        col_defs = [f"{col[1]} {col[2]}" for col in columns]
-        schema_info.append(f"- {table} ({', '.join(col_defs)})")
+    schema_info = [f"- {table} ({', '.join(col_defs)})" for table, col_defs in tables.items()]
 
     if schema_info:
-        return "\n".join(schema_info)
+        schema_cache = "\n".join(schema_info)
     else:
-        return "No tables available."
+        schema_cache = "No tables available."
+    return schema_cache
 
-def ask_llm_for_sql(schema_str, user_query):
+def invalidate_schema_cache(sql_query):
+    """
+    Clears the cached schema if the SQL statement can change it.
+    """
+    global schema_cache
+    words = sql_query.split(None, 1)
+    if words and words[0].upper() in SCHEMA_CHANGING_KEYWORDS:
+        schema_cache = None
+
+async def ask_llm_for_sql(schema_str, user_query, echo=False):
     """
     Calls the Chat Completions endpoint to generate SQL based on user query + schema.
+    The response is streamed; with echo=True tokens are printed as they arrive.
     """
 
     if not client:
@@ -98,21 +163,45 @@ def ask_llm_for_sql(schema_str, user_query):
     user_content = user_query  # The natural language request
 
     try:
-        completion = client.chat.completions.create(
+        stream = await client.chat.completions.create(
             model="gpt-3.5-turbo",  
             messages=[
                 {"role": "developer", "content": developer_content},
                 {"role": "user", "content": user_content},
             ],
             temperature=0.0,
-            max_tokens=300
+            max_tokens=300,
+            stream=True
         )
-        ai_response = completion.choices[0].message.content.strip()
+        tokens = []
+        if echo:
+            print("\n--- AI Response (streaming) ---")
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                tokens.append(token)
+                if echo:
+                    print(token, end="", flush=True)
+        if echo:
+            print()
+        ai_response = "".join(tokens).strip()
         return ai_response
     except Exception as e:
         print(f"Error from OpenAI API: {e}")
         return None
 
+async def ask_llm_for_sql_batch(schema_str, user_queries):
+    """
+    Sends several user queries to the LLM concurrently and returns the responses
+    in the same order. A single query is streamed to the console as it arrives.
+    """
+    echo = len(user_queries) == 1
+    return await asyncio.gather(
+        *(ask_llm_for_sql(schema_str, user_query, echo) for user_query in user_queries)
+    )
+
 def parse_ai_response(ai_response):
     """
     Attempts to parse the AI response into:
@@ -120,47 +209,30 @@ def parse_ai_response(ai_response):
       - explanation: The short comment or explanation
 
     If no "SQL Query" or "Explanation" heading is found,
-    we treat the entire response as a single SQL command.
+    we treat the entire response as a single SQL command;
+    an "Explanation" heading alone yields no SQL.
     """
 
     if not ai_response:
         return None, None
 
     # 1) Strip any lines with triple backticks
-    lines_stripped = []
-    for line in ai_response.splitlines():
-        if "```" in line:
-            continue
-        lines_stripped.append(line)
-    cleaned = "\n".join(lines_stripped)
-
-    # 2) Attempt to parse
-    lines = cleaned.splitlines()
-    sql_query = []
-    explanation = []
-    mode = None  # can be "sql" or "exp"
-
-    for line in lines:
-        lower_line = line.lower()
-        if "sql query" in lower_line:
-            mode = "sql"
-            continue
-        elif "explanation" in lower_line:
-            mode = "exp"
-            continue
-
-        if mode == "sql":
-            sql_query.append(line)
-        elif mode == "exp":
-            explanation.append(line)
-
-    sql_query_str = "\n".join(sql_query).strip()
-    explanation_str = "\n".join(explanation).strip()
-
-    # 3) Fallback if we didn't find the headings at all
-    if not sql_query_str and not explanation_str:
-        # We'll treat the entire AI response as a single SQL query
-        sql_query_str = cleaned
+    cleaned = CODE_FENCE_RE.sub("", ai_response)
+
+    # 2) Split on the headings in a single regex pass
+    match = AI_RESPONSE_RE.search(cleaned)
+    explanation_match = None if match else EXPLANATION_RE.search(cleaned)
+    if match:
+        sql_query_str = match.group("sql").strip()
+        explanation_str = (match.group("explanation") or "").strip()
+    elif explanation_match:
+        # An explanation without a "SQL Query" heading: there's no SQL to run
+        sql_query_str = ""
+        explanation_str = explanation_match.group("explanation").strip()
+    else:
+        # 3) Fallback if we didn't find the headings at all:
+        # treat the entire AI response as a single SQL query
+        sql_query_str = cleaned.strip()
         explanation_str = ""
 
     return sql_query_str, explanation_str
@@ -169,16 +241,50 @@ def execute_sql_and_print(conn, sql_query):
     """
     Executes the given SQL query and prints up to 10 rows from the result.
     """
+    invalidate_schema_cache(sql_query)
     try:
         cursor = conn.cursor()
         cursor.execute(sql_query)
-        rows = cursor.fetchall()
+        # Only fetch the rows we show so SQLite stops producing the rest
+        rows = cursor.fetchmany(10)
         print(f"\nQuery Results (up to 10 rows):")
-        for i, row in enumerate(rows[:10], start=1):
+        for i, row in enumerate(rows, start=1):
             print(f"{i}. {row}")
     except Exception as e:
         print(f"Error executing SQL: {e}")
 
+def handle_ai_response(conn, ai_response, echoed=False):
+    """
+    Parses an AI response, shows the generated SQL and explanation, then executes it.
+    With echoed=True the response was already streamed to the console, so it
+    isn't printed a second time.
+    """
+    if not ai_response:
+        print("No valid response from the LLM.")
+        return
+
+    # Parse
+    sql_query, explanation = parse_ai_response(ai_response)
+    if not sql_query:
+        if echoed:
+            print("Could not parse SQL from the AI response above.")
+        else:
+            print("Could not parse SQL from AI response:")
+            print(ai_response)
+        return
+
+    if not echoed:
+        print("\n--- AI-Generated SQL ---")
+        print(sql_query)
+        print("\n--- Explanation ---")
+        if explanation:
+            print(explanation)
+        else:
+            print("No explanation provided.")
+
+    # Execute
+    execute_sql_and_print(conn, sql_query)
+
 def main():
     parser = argparse.ArgumentParser(description="Step 5 with new OpenAI Python library (Chat Completions).")
     parser.add_argument("--db_name", required=True, help="Name of the SQLite database file.")
@@ -190,9 +296,12 @@ def main():
     # 2) Connect to DB
     conn = connect_to_db(args.db_name)
 
+    # One event loop for the whole session so the async client's connections are reused
+    loop = asyncio.new_event_loop()
+
     print("\nWelcome to the ChatSheetsAI CLI (latest OpenAI library)!")
     print("Commands:")
-    print("  ask <natural language>  - Let AI generate SQL and execute it.")
+    print("  ask <natural language>  - Let AI generate SQL and execute it (separate several prompts with ';;').")
     print("  query <SQL statement>   - Execute a direct SQL statement yourself.")
     print("  list tables             - List all tables in this DB.")
     print("  exit                    - Exit.\n")
@@ -207,6 +316,8 @@ def main():
 
         if command == "exit":
             print("Exiting CLI.")
+            # Let SQLite refresh any statistics that have gone stale during the session
+            conn.execute("PRAGMA optimize;")
             break
 
         elif command == "list":
@@ -221,34 +332,23 @@ def main():
             if len(parts) < 2:
                 print("Usage: ask <natural language prompt>")
                 continue
-            user_query = parts[1]
+            user_queries = [q.strip() for q in parts[1].split(ASK_SEPARATOR) if q.strip()]
+            if not user_queries:
+                print("Usage: ask <natural language prompt>")
+                continue
 
             # Gather schema (may be "No tables available.")
             schema_str = get_db_schema(conn)
 
-            # Call the LLM
-            ai_response = ask_llm_for_sql(schema_str, user_query)
-            if not ai_response:
-                print("No valid response from the LLM.")
-                continue
-
-            # Parse
-            sql_query, explanation = parse_ai_response(ai_response)
-            if not sql_query:
-                print("Could not parse SQL from AI response:")
-                print(ai_response)
-                continue
-
-            print("\n--- AI-Generated SQL ---")
-            print(sql_query)
-            print("\n--- Explanation ---")
-            if explanation:
-                print(explanation)
-            else:
-                print("No explanation provided.")
+            # Call the LLM (concurrently when several prompts were given)
+            ai_responses = loop.run_until_complete(ask_llm_for_sql_batch(schema_str, user_queries))
 
-            # Execute
-            execute_sql_and_print(conn, sql_query)
+            # A single prompt's response was streamed to the console as it arrived
+            echoed = len(user_queries) == 1
+            for user_query, ai_response in zip(user_queries, ai_responses):
+                if not echoed:
+                    print(f"\n=== {user_query} ===")
+                handle_ai_response(conn, ai_response, echoed)
 
         elif command == "query":
             # Direct user-driven SQL
@@ -262,6 +362,7 @@ def main():
             print(f"Unknown command: {command}")
             print("Type 'ask <prompt>' or 'query <SQL>' or 'list tables' or 'exit'.")
 
+    loop.close()
     conn.close()
 
 if __name__ == "__main__":